@@ -1,18 +1,22 @@
 from flask import Flask, request
-from sidecar import Sidecar
+from sidecar import Sidecar, node_url
 import threading
 import time
 from typing import Dict, List, Optional
 
 
 class Acceptor:
-    def __init__(self, host: str = "127.0.0.1", port: int = 1004):
+    def __init__(self, host: str = "127.0.0.1", port: int = 1004, transport: str = "http",
+                 coordinator_url: Optional[str] = None):
         self.app = Flask(__name__)
         self.sidecar = Sidecar("acceptor")
         self.host = host
         self.port = port
+        self.url = node_url(transport, host, port, "acceptor")
+        self.coordinator_url = coordinator_url or node_url(transport, "127.0.0.1", 1001, "coordinator")
         self.nodes: Dict[str, Optional[Dict]] = {"learner": None}
         self._setup_routes()
+        self.sidecar.install_debug_routes(self.app)
 
     def _setup_routes(self) -> None:
 
@@ -29,11 +33,14 @@ class Acceptor:
                 print("Error: Invalid data")
                 return {"error": "Invalid data"}, 400
 
-            if not self._validate_data(letter_range, count, words):
+            with self.sidecar.trace("validate"):
+                valid = self._validate_data(letter_range, count, words)
+            if not valid:
                 print("Error: Validation failed")
                 return {"error": "Validation failed"}, 400
 
-            self._forward_to_learner(letter_range, count, words)
+            if not self._forward_to_learner(letter_range, count, words):
+                return {"error": "Learner did not confirm"}, 502
             return {"status": "Accepted"}
 
         @self.app.route("/nodes", methods=["POST"])
@@ -52,23 +59,29 @@ class Acceptor:
         except ValueError:
             return False
 
-    def _forward_to_learner(self, letter_range: str, count: int, words: List[str]) -> None:
+    def _forward_to_learner(self, letter_range: str, count: int, words: List[str]) -> bool:
+        """Send accepted words to the learner; True once the learner confirms them."""
         if self.nodes["learner"]:
             print(f"Sending to learner: {self.nodes['learner']['url']}")
-            self.sidecar.send(
+            response = self.sidecar.send(
                 f"{self.nodes['learner']['url']}/learn",
                 {"letter_range": letter_range, "count": count, "words": words},
                 retries=3,
                 delay=1
             )
+            return response is not None and response.status_code < 400
         else:
             print("No learner registered")
+            return False
 
     def _send_test_request(self) -> None:
         time.sleep(1)
+        self._register()
+
+    def _register(self) -> None:
         self.sidecar.send(
-            "http://127.0.0.1:1001/register",
-            {"type": "acceptor", "url": f"http://{self.host}:{self.port}"},
+            f"{self.coordinator_url}/register",
+            {"type": "acceptor", "url": self.url},
             retries=3,
             delay=1
         )
@@ -80,11 +93,11 @@ class Acceptor:
         test_thread.daemon = True
         test_thread.start()
 
-        self.app.run(host=self.host, port=self.port)
+        self.sidecar.serve(self.app, self.url)
 
 
-def run_acceptor() -> None:
-    acceptor = Acceptor()
+def run_acceptor(transport: str = "http") -> None:
+    acceptor = Acceptor(transport=transport)
     acceptor.run()
 
 
@@ -1,23 +1,44 @@
 from flask import Flask, request
-from sidecar import Sidecar
+from sidecar import Sidecar, node_url
+from flow_control import AimdController
+from ingest_cache import IngestCache
 import threading
 import time
 import math
-from typing import Dict, List, Optional
+import string
+import statistics
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Dict, List, Optional, Set, Tuple
 
 
 class Coordinator:
-    def __init__(self, host: str = "127.0.0.1", port: int = 1001):
+    HEARTBEAT_TIMEOUT = 6.0
+    SLOW_FACTOR = 3.0
+    SLOW_LATENCY_FLOOR = 0.5
+    RESTORE_BEATS = 3
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 1001, transport: str = "http",
+                 dispatch_timeout: float = 2.0):
         self.app = Flask(__name__)
         self.sidecar = Sidecar("coordinator")
         self.host = host
         self.port = port
+        self.transport = transport
+        self.url = node_url(transport, host, port, "coordinator")
         self.nodes: Dict[str, any] = {
             "proposers": [],
             "acceptors": [],
             "learner": None
         }
+        self.health: Dict[str, Dict[str, float]] = {}
+        self.dispatch_timeout = dispatch_timeout
+        self._lock = threading.RLock()
+        self.flow = AimdController()
+        self.ingest_cache = IngestCache()
+        self._executor = ThreadPoolExecutor(max_workers=64)
+        self._batch_executor = ThreadPoolExecutor(max_workers=int(self.flow.max_window))
         self._setup_routes()
+        self.sidecar.install_debug_routes(self.app)
 
     def _setup_routes(self) -> None:
 
@@ -37,17 +58,20 @@ class Coordinator:
 
             print(f"Registering: {node_type} at {node_url}")
 
-            if node_type == "proposer":
-                self._register_proposer(node_url)
-            elif node_type == "acceptor":
-                self._register_acceptor(node_url)
-            elif node_type == "learner":
-                self.nodes["learner"] = {"url": node_url}
-            else:
-                return {"error": "Invalid node type"}, 400
+            with self._lock:
+                if node_type == "proposer":
+                    self._register_proposer(node_url)
+                elif node_type == "acceptor":
+                    self._register_acceptor(node_url)
+                elif node_type == "learner":
+                    self.nodes["learner"] = {"url": node_url}
+                    # A (re)started learner has none of the previously committed chunks.
+                    self.ingest_cache.clear()
+                else:
+                    return {"error": "Invalid node type"}, 400
 
-            self._assign_ranges()
-            self._broadcast_nodes()
+                self._assign_ranges()
+                self._broadcast_nodes()
             print(f"Current nodes: {self.nodes}")
             return {"status": "Registered"}
 
@@ -55,32 +79,238 @@ class Coordinator:
         def start():
             data = request.json or {}
             filename = data.get("filename", "sample.txt")
+            try:
+                batch_size = int(data.get("batch_size", 64))
+            except (TypeError, ValueError):
+                return {"error": "batch_size must be an integer"}, 400
+            if batch_size < 1:
+                return {"error": "batch_size must be at least 1"}, 400
+            if data.get("force"):
+                self.ingest_cache.clear()
             print(f"Processing file: {filename}")
             try:
                 with open(filename, "r") as file:
-                    lines = file.readlines()
+                    lines = [line.strip() for line in file.readlines()]
+                    lines = [line for line in lines if line]
                     print(f"Read {len(lines)} lines")
-                    for line in lines:
-                        line = line.strip()
-                        if line:
-                            print(f"Sending line to {len(self.nodes['proposers'])} proposers: {line}")
-                            for proposer in self.nodes["proposers"]:
-                                self.sidecar.send(
-                                    f"{proposer['url']}/line",
-                                    {"text": line},
-                                    retries=3,
-                                    delay=1
-                                )
-                return {"status": "Document processed"}
+                    chunks = skipped = skipped_words = 0
+                    for digest, chunk in self.ingest_cache.chunk(lines, batch_size):
+                        chunks += 1
+                        if self.ingest_cache.seen(digest):
+                            skipped += 1
+                            skipped_words += sum(self.ingest_cache.contributions(digest).values())
+                            continue
+                        self.flow.acquire()
+                        self._batch_executor.submit(self._run_batch, digest, chunk)
+                    self.flow.wait_idle()
+                print(f"Skipped {skipped} of {chunks} chunks already counted")
+                return {"status": "Document processed", "chunks": chunks, "skipped": skipped,
+                        "skipped_words": skipped_words}
             except Exception as e:
                 print(f"Error: {e}")
                 return {"error": str(e)}, 500
 
+        @self.app.route("/heartbeat", methods=["POST"])
+        def heartbeat():
+            data = request.json or {}
+            url = data.get("url")
+            if not any(p["url"] == url for p in self.nodes["proposers"]):
+                return {"error": "Unknown node"}, 404
+            try:
+                latency = float(data.get("latency", 0.0))
+                load = int(data.get("load", 0))
+                lines = int(data.get("lines", 0))
+            except (TypeError, ValueError):
+                return {"error": "latency, load and lines must be numbers"}, 400
+
+            previous = self.health.get(url, {})
+            good = latency <= self._slow_threshold(url)
+            self.health[url] = {
+                "last_seen": time.time(),
+                "latency": latency,
+                "load": load,
+                "lines": lines,
+                "good_beats": previous.get("good_beats", 0) + 1 if good else 0
+            }
+            self._update_health()
+            return {"status": "ok"}
+
+        @self.app.route("/health", methods=["GET"])
+        def health():
+            return {"proposers": self.nodes["proposers"], "heartbeats": self.health}
+
+        @self.app.route("/flow", methods=["GET"])
+        def flow():
+            return self.flow.snapshot()
+
+    def _run_batch(self, digest: str, lines: List[str]) -> None:
+        """Dispatch one chunk from the batch pool and record it if committed.
+
+        The chunk's window slot is freed only once every send for it has
+        finished, including stragglers left behind by a dispatch timeout;
+        those give up at dispatch_timeout themselves.
+        """
+        stragglers = set()
+        try:
+            with self.sidecar.trace("dispatch"):
+                contributions, stragglers = self._dispatch_batch(lines)
+            if contributions is not None and self._covers_alphabet(contributions):
+                self.ingest_cache.commit(digest, contributions)
+        except Exception as e:
+            print(f"Error dispatching batch: {e}")
+        finally:
+            self._release_after(stragglers)
+
+    def _release_after(self, futures: Set[Future]) -> None:
+
+        if not futures:
+            self.flow.release()
+            return
+        remaining = [len(futures)]
+        lock = threading.Lock()
+
+        def finished(_future: Future) -> None:
+            with lock:
+                remaining[0] -= 1
+                last = remaining[0] == 0
+            if last:
+                self.flow.release()
+
+        for future in futures:
+            future.add_done_callback(finished)
+
+    def _send_lines(self, url: str, lines: List[str]):
+        """Send a batch to one proposer and report its ack latency to the flow controller.
+
+        A single attempt bounded by dispatch_timeout, so a send to a hung
+        proposer holds its batch's window slot no longer than it takes to
+        demote that proposer.
+        """
+        started = time.perf_counter()
+        response = self.sidecar.send(f"{url}/lines", {"lines": lines}, retries=1,
+                                     timeout=self.dispatch_timeout)
+        ok = response is not None and response.status_code < 400
+        self.flow.record(url, time.perf_counter() - started, ok, len(lines))
+        return response
+
+    def _dispatch_batch(self, lines: List[str]) -> Tuple[Optional[Dict[str, int]], Set[Future]]:
+        """Send a batch of lines to every proposer holding a range.
+
+        Proposers that fail or do not answer within dispatch_timeout are marked
+        dead or slow, their ranges are reassigned, and the batch is re-sent to
+        the new owners. The learner keeps unique words, so duplicates are harmless.
+
+        Returns the word count per acked range (None if any send failed), which
+        only counts once the learner confirmed it, and the sends still running
+        past dispatch_timeout.
+        """
+        active = self._ranged_proposers()
+        print(f"Sending {len(lines)} lines to {len(active)} proposers")
+        futures = {
+            self._executor.submit(self._send_lines, p["url"], lines): p
+            for p in active
+        }
+        if not futures:
+            return None, set()
+        done, pending = wait(futures, timeout=self.dispatch_timeout)
+
+        failed = {futures[f]["url"]: "dead" for f in done if f.result() is None}
+        failed.update({futures[f]["url"]: "slow" for f in pending})
+        if not failed:
+            return self._contributions([f.result() for f in done]), pending
+
+        for url, status in failed.items():
+            self._set_status(url, status)
+        if not self._reassign_if_changed():
+            return None, pending
+        return self._contributions([
+            self._send_lines(proposer["url"], lines)
+            for proposer in self._ranged_proposers()
+        ]), pending
+
+    def _ranged_proposers(self) -> List[Dict[str, any]]:
+        """Snapshot of the proposers holding a range, never taken mid-reassignment."""
+        with self._lock:
+            return [dict(p) for p in self.nodes["proposers"] if p["range"]]
+
+    def _contributions(self, responses: List) -> Optional[Dict[str, int]]:
+        """Word count per range from proposer acks; None if any ack is missing or an error."""
+        contributions: Dict[str, int] = {}
+        for response in responses:
+            if response is None or response.status_code >= 400:
+                return None
+            data = response.json() or {}
+            letter_range = data.get("range")
+            contributions[letter_range] = contributions.get(letter_range, 0) + data.get("count", 0)
+        return contributions
+
+    @staticmethod
+    def _covers_alphabet(contributions: Dict[str, int]) -> bool:
+        """True if the acked ranges together cover A-Z, so no letter missed the chunk."""
+        covered = set()
+        for letter_range in contributions:
+            start, _, end = (letter_range or "").upper().partition("-")
+            if start and end:
+                covered.update(chr(c) for c in range(ord(start), ord(end) + 1))
+        return covered >= set(string.ascii_uppercase)
+
+    def _set_status(self, url: str, status: str) -> None:
+        for proposer in self.nodes["proposers"]:
+            if proposer["url"] == url and proposer["status"] != status:
+                print(f"Proposer {url} is now {status}")
+                proposer["status"] = status
+                if status != "healthy" and url in self.health:
+                    self.health[url]["good_beats"] = 0
+
+    def _slow_threshold(self, url: str) -> float:
+        """Latency above which ``url`` counts as slow: a multiple of its peers' median latency."""
+        peers = [h["latency"] for peer, h in self.health.items() if peer != url]
+        if not peers:
+            return float("inf")
+        return max(self.SLOW_LATENCY_FLOOR, self.SLOW_FACTOR * statistics.median(peers))
+
+    def _update_health(self) -> None:
+        """Classify proposers as healthy, slow or dead from their latest heartbeats.
+
+        A demoted proposer is only restored after RESTORE_BEATS consecutive good
+        heartbeats, so ranges do not flip back and forth.
+        """
+        now = time.time()
+        for proposer in self.nodes["proposers"]:
+            beat = self.health.get(proposer["url"])
+            if beat is None:
+                continue
+            if now - beat["last_seen"] > self.HEARTBEAT_TIMEOUT:
+                self._set_status(proposer["url"], "dead")
+            elif beat["latency"] > self._slow_threshold(proposer["url"]):
+                self._set_status(proposer["url"], "slow")
+            elif proposer["status"] == "healthy" or beat["good_beats"] >= self.RESTORE_BEATS:
+                self._set_status(proposer["url"], "healthy")
+        self._reassign_if_changed()
+
+    def _reassign_if_changed(self) -> bool:
+        """Reassign ranges if the set of healthy proposers no longer matches the ranged ones."""
+        with self._lock:
+            healthy = {p["url"] for p in self.nodes["proposers"] if p["status"] == "healthy"}
+            ranged = {p["url"] for p in self.nodes["proposers"] if p["range"]}
+            if not healthy or healthy == ranged:
+                return False
+            self._assign_ranges()
+            self._broadcast_nodes()
+            return True
+
+    def _monitor_health(self) -> None:
+        """Periodically re-check heartbeats so silent nodes are detected."""
+        while True:
+            time.sleep(self.HEARTBEAT_TIMEOUT / 2)
+            self._update_health()
+
     def _register_proposer(self, node_url: str) -> None:
         """Register a proposer node if not already registered."""
         if not any(p["url"] == node_url for p in self.nodes["proposers"]):
-            self.nodes["proposers"].append({"url": node_url, "range": None})
+            self.nodes["proposers"].append({"url": node_url, "range": None, "status": "healthy"})
         else:
+            self._set_status(node_url, "healthy")
             print(f"Proposer {node_url} already registered")
 
     def _register_acceptor(self, node_url: str) -> None:
@@ -89,27 +319,35 @@ class Coordinator:
             self.nodes["acceptors"].append({"url": node_url})
 
     def _assign_ranges(self) -> None:
-        """Assign letter ranges to proposers."""
-        num_proposers = len(self.nodes["proposers"])
-        print(f"Assigning ranges to {num_proposers} proposers")
-        if num_proposers == 0:
-            return
+        """Assign letter ranges to healthy proposers.
 
-        for proposer in self.nodes["proposers"]:
-            proposer["range"] = None
-
-        letters = list("ABCDEFGHIJKLMNOPQRSTUVWXYZ")
-        letters_per_proposer = max(1, math.ceil(len(letters) / num_proposers))
-
-        for i, proposer in enumerate(self.nodes["proposers"]):
-            start_idx = i * letters_per_proposer
-            end_idx = min(start_idx + letters_per_proposer - 1, len(letters) - 1)
-            if start_idx < len(letters):
-                letter_range = f"{letters[start_idx]}-{letters[end_idx]}"
-                proposer["range"] = letter_range
-                print(f"Assigned {letter_range} to {proposer['url']}")
+        The new assignment is built first and swapped in under the lock, so a
+        batch dispatched meanwhile sees either the old ranges or the new ones.
+        """
+        with self._lock:
+            proposers = [p for p in self.nodes["proposers"] if p["status"] == "healthy"]
+            num_proposers = len(proposers)
+            print(f"Assigning ranges to {num_proposers} proposers")
+            if num_proposers == 0:
+                return
+
+            letters = list("ABCDEFGHIJKLMNOPQRSTUVWXYZ")
+            letters_per_proposer = max(1, math.ceil(len(letters) / num_proposers))
+
+            assignment = {}
+            for i, proposer in enumerate(proposers):
+                start_idx = i * letters_per_proposer
+                end_idx = min(start_idx + letters_per_proposer - 1, len(letters) - 1)
+                if start_idx < len(letters):
+                    assignment[proposer["url"]] = f"{letters[start_idx]}-{letters[end_idx]}"
+
+            for proposer in self.nodes["proposers"]:
+                proposer["range"] = assignment.get(proposer["url"])
+
+            for url, letter_range in assignment.items():
+                print(f"Assigned {letter_range} to {url}")
                 self.sidecar.send(
-                    f"{proposer['url']}/set_range",
+                    f"{url}/set_range",
                     {"range": letter_range},
                     retries=3,
                     delay=1
@@ -126,6 +364,8 @@ class Coordinator:
 
         for node_type in ["proposers", "acceptors"]:
             for node in self.nodes[node_type]:
+                if node.get("status", "healthy") != "healthy":
+                    continue
                 self.sidecar.send(
                     f"{node['url']}/nodes",
                     node_info,
@@ -145,8 +385,8 @@ class Coordinator:
         """Send a test registration request."""
         time.sleep(1)
         self.sidecar.send(
-            f"http://{self.host}:{self.port}/register",
-            {"type": "proposer", "url": "http://127.0.0.1:1002"},
+            f"{self.url}/register",
+            {"type": "proposer", "url": node_url(self.transport, "127.0.0.1", 1002, "proposer")},
             retries=3,
             delay=1
         )
@@ -159,11 +399,15 @@ class Coordinator:
         test_thread.daemon = True
         test_thread.start()
 
-        self.app.run(host=self.host, port=self.port)
+        monitor_thread = threading.Thread(target=self._monitor_health)
+        monitor_thread.daemon = True
+        monitor_thread.start()
+
+        self.sidecar.serve(self.app, self.url)
 
 
-def run_coordinator():
-    coordinator = Coordinator()
+def run_coordinator(transport: str = "http"):
+    coordinator = Coordinator(transport=transport)
     coordinator.run()
 
 
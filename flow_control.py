@@ -0,0 +1,98 @@
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+
+
+class AimdController:
+    """Additive-increase/multiplicative-decrease window for in-flight batches.
+
+    Every proposer ack is recorded with its latency and batch size. Each node
+    keeps a slowly moving baseline of its per-line latency; the excess of an
+    ack over baseline x lines is treated as queueing delay. Successful acks
+    without much queueing grow the window by about one batch per window's worth
+    of acks. An error, or queueing delay above tolerance x the expected latency
+    (and above latency_floor), shrinks it by decrease_factor, at most once per
+    smoothed round trip.
+    """
+
+    def __init__(self, initial_window: float = 4.0, min_window: float = 1.0, max_window: float = 32.0,
+                 decrease_factor: float = 0.5, tolerance: float = 1.0, latency_floor: float = 0.05) -> None:
+        self.window = initial_window
+        self.min_window = min_window
+        self.max_window = max_window
+        self.decrease_factor = decrease_factor
+        self.tolerance = tolerance
+        self.latency_floor = latency_floor
+        self.in_flight = 0
+        self.limiting_node: Optional[str] = None
+        self.nodes: Dict[str, Dict[str, float]] = {}
+        self._last_decrease = 0.0
+        self._completions: deque = deque(maxlen=100)
+        self._cond = threading.Condition()
+
+    def acquire(self) -> None:
+        """Block until another batch fits in the window."""
+        with self._cond:
+            self._cond.wait_for(lambda: self.in_flight < int(self.window))
+            self.in_flight += 1
+
+    def release(self) -> None:
+        """Mark a batch as finished (acked by all proposers, or given up on)."""
+        with self._cond:
+            self.in_flight -= 1
+            self._completions.append(time.time())
+            self._cond.notify_all()
+
+    def wait_idle(self) -> None:
+
+        with self._cond:
+            self._cond.wait_for(lambda: self.in_flight == 0)
+
+    def record(self, node: str, latency: float, ok: bool, lines: int = 1) -> None:
+        """Feed one ack (or failure) for a batch of ``lines`` from ``node`` into the controller."""
+        per_line = latency / max(1, lines)
+        with self._cond:
+            stats = self.nodes.setdefault(node, {
+                "latency": latency, "baseline": per_line, "queueing": 0.0, "error_rate": 0.0, "acks": 0
+            })
+            stats["latency"] = 0.8 * stats["latency"] + 0.2 * latency
+            stats["error_rate"] = 0.8 * stats["error_rate"] + (0.0 if ok else 0.2)
+            stats["acks"] += 1
+
+            expected = stats["baseline"] * max(1, lines)
+            queueing = max(0.0, latency - expected)
+            congested = queueing > max(self.latency_floor, self.tolerance * expected)
+            if ok:
+                stats["queueing"] = 0.8 * stats["queueing"] + 0.2 * queueing
+                stats["baseline"] = 0.95 * stats["baseline"] + 0.05 * per_line
+
+            if ok and not congested:
+                self.window = min(self.max_window, self.window + 1.0 / self.window)
+            else:
+                now = time.time()
+                if now - self._last_decrease >= stats["latency"]:
+                    self.window = max(self.min_window, self.window * self.decrease_factor)
+                    self._last_decrease = now
+                    self.limiting_node = node
+            self._cond.notify_all()
+
+    def rate(self) -> float:
+        """Batches completed per second over the recent completions."""
+        with self._cond:
+            if len(self._completions) < 2:
+                return 0.0
+            elapsed = self._completions[-1] - self._completions[0]
+            return (len(self._completions) - 1) / elapsed if elapsed > 0 else 0.0
+
+    def snapshot(self) -> Dict[str, any]:
+
+        rate = self.rate()
+        with self._cond:
+            return {
+                "window": round(self.window, 2),
+                "in_flight": self.in_flight,
+                "batches_per_second": round(rate, 2),
+                "limiting_node": self.limiting_node,
+                "nodes": {url: dict(stats) for url, stats in self.nodes.items()}
+            }
\ No newline at end of file
@@ -0,0 +1,61 @@
+import hashlib
+import threading
+import zlib
+from typing import Dict, Iterator, List, Tuple
+
+
+class IngestCache:
+    """Content-addressed record of the chunks of input already counted.
+
+    Lines are split into content-defined chunks: a chunk ends after any line
+    whose CRC32 is divisible by average_lines (or at max_lines), so appending to
+    a file or editing one spot only changes the chunks around the change. Each
+    chunk is keyed by a BLAKE2b digest of its lines and is committed, with the
+    word count each letter range contributed, once the learner has confirmed
+    its words for the whole alphabet.
+    """
+
+    def __init__(self) -> None:
+        self.committed: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def chunk(lines: List[str], average_lines: int = 64) -> Iterator[Tuple[str, List[str]]]:
+        """Yield (digest, lines) for each content-defined chunk of ``lines``."""
+        max_lines = average_lines * 4
+        start = 0
+        for i, line in enumerate(lines):
+            if zlib.crc32(line.encode()) % average_lines == 0 or i + 1 - start >= max_lines:
+                yield IngestCache._digest(lines[start:i + 1]), lines[start:i + 1]
+                start = i + 1
+        if start < len(lines):
+            yield IngestCache._digest(lines[start:]), lines[start:]
+
+    @staticmethod
+    def _digest(lines: List[str]) -> str:
+
+        h = hashlib.blake2b(digest_size=16)
+        for line in lines:
+            h.update(line.encode())
+            h.update(b"\n")
+        return h.hexdigest()
+
+    def seen(self, digest: str) -> bool:
+
+        with self._lock:
+            return digest in self.committed
+
+    def commit(self, digest: str, contributions: Dict[str, int]) -> None:
+
+        with self._lock:
+            self.committed[digest] = dict(contributions)
+
+    def contributions(self, digest: str) -> Dict[str, int]:
+        """Word count per letter range recorded for a committed chunk (empty if not committed)."""
+        with self._lock:
+            return dict(self.committed.get(digest, {}))
+
+    def clear(self) -> None:
+
+        with self._lock:
+            self.committed = {}
\ No newline at end of file
@@ -1,18 +1,31 @@
-from flask import Flask, request
-from sidecar import Sidecar
+from flask import Flask, Response, request
+from sidecar import Sidecar, node_url
+from collections import deque
 import threading
 import time
-from typing import Dict, List, Optional
+import json
+from typing import Dict, Iterator, List, Optional, Tuple
 
 
 class Learner:
-    def __init__(self, host: str = "127.0.0.1", port: int = 1006):
+    HISTORY_SIZE = 1024
+    KEEPALIVE_SECONDS = 15.0
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 1006, transport: str = "http",
+                 coordinator_url: Optional[str] = None):
         self.app = Flask(__name__)
         self.sidecar = Sidecar("learner")
         self.host = host
         self.port = port
+        self.url = node_url(transport, host, port, "learner")
+        self.coordinator_url = coordinator_url or node_url(transport, "127.0.0.1", 1001, "coordinator")
         self.results: Dict[str, Dict[str, any]] = {}
+        self.version = 0
+        self.history: deque = deque(maxlen=self.HISTORY_SIZE)
+        self._changed = threading.Condition()
+        self._table_cache: Tuple[int, List[Dict[str, str]]] = (-1, [])
         self._setup_routes()
+        self.sidecar.install_debug_routes(self.app)
 
     def _setup_routes(self) -> None:
 
@@ -25,10 +38,17 @@ class Learner:
 
             print(f"Learning: {letter_range} -> count={count}, words={words}")
 
-            if letter_range:
-                self._process_words(words)
+            changed = {}
+            with self.sidecar.trace("update"):
+                with self._changed:
+                    if letter_range:
+                        changed = self._process_words(words)
+                        if changed:
+                            self._record_changes(changed)
+                    # Read under the lock so the version is the one these changes produced.
+                    version = self.version
 
-            return {"status": "Learned"}
+            return {"status": "Learned", "version": version, "changed": changed}
 
         @self.app.route("/results", methods=["GET"])
         def get_results():
@@ -36,12 +56,38 @@ class Learner:
             print(f"Returning results: {table}")
             return {"results": table}
 
+        @self.app.route("/results/stream", methods=["GET"])
+        def stream_results():
+            try:
+                since = int(request.headers.get("Last-Event-ID") or request.args.get("since", 0))
+                coalesce = float(request.args.get("coalesce", 0.1))
+            except ValueError:
+                return {"error": "Last-Event-ID/since must be an integer, coalesce a number"}, 400
+            if since < 0 or not 0 <= coalesce <= 5:
+                return {"error": "since must be >= 0 and coalesce in [0, 5]"}, 400
+            return Response(self._event_stream(since, coalesce), mimetype="text/event-stream",
+                            headers={"Cache-Control": "no-cache"})
+
+        @self.app.route("/results/poll", methods=["GET"])
+        def poll_results():
+            try:
+                since = int(request.args.get("since", 0))
+                timeout = min(float(request.args.get("timeout", 30)), 60.0)
+            except ValueError:
+                return {"error": "since must be an integer and timeout a number"}, 400
+            if since < 0 or not timeout >= 0:
+                return {"error": "since and timeout must not be negative"}, 400
+            self._wait_for_version(since, timeout)
+            version, changes, snapshot = self._changes_since(since)
+            return {"version": version, "snapshot": snapshot, "changes": changes}
+
         @self.app.route("/nodes", methods=["POST"])
         def update_nodes():
             return {"status": "Nodes updated"}
 
-    def _process_words(self, words: List[str]) -> None:
-
+    def _process_words(self, words: List[str]) -> Dict[str, int]:
+        """Add new words to the results and return the new count of every letter that changed."""
+        changed = {}
         for word in words:
             if word:
                 start_letter = word[0].lower()
@@ -50,24 +96,77 @@ class Learner:
                 if word not in self.results[start_letter]["words"]:
                     self.results[start_letter]["count"] += 1
                     self.results[start_letter]["words"].append(word)
+                    changed[start_letter.upper()] = self.results[start_letter]["count"]
+        return changed
+
+    def _record_changes(self, changed: Dict[str, int]) -> None:
+        """Bump the version, remember the change and wake stream and long-poll waiters.
+
+        Must be called with self._changed held.
+        """
+        self.version += 1
+        self.history.append((self.version, changed))
+        self._changed.notify_all()
+
+    def _wait_for_version(self, since: int, timeout: float) -> None:
+
+        with self._changed:
+            self._changed.wait_for(lambda: self.version > since, timeout=timeout)
+
+    def _changes_since(self, since: int) -> Tuple[int, Dict[str, int], bool]:
+        """Coalesce every change after version ``since`` into one letter -> count map.
+
+        Falls back to a full snapshot when ``since`` is older than the retained history.
+        """
+        with self._changed:
+            if since > self.version or (self.history and since < self.history[0][0] - 1):
+                snapshot = {letter.upper(): data["count"] for letter, data in self.results.items()}
+                return self.version, snapshot, True
+            changes: Dict[str, int] = {}
+            for version, changed in self.history:
+                if version > since:
+                    changes.update(changed)
+            return self.version, changes, False
+
+    def _event_stream(self, since: int, coalesce: float) -> Iterator[str]:
+        """Yield Server-Sent Events for count changes; the event id is the resume token."""
+        yield "retry: 2000\n\n"
+        while True:
+            self._wait_for_version(since, self.KEEPALIVE_SECONDS)
+            if self.version <= since:
+                yield ": keepalive\n\n"
+                continue
+            time.sleep(coalesce)
+            since, changes, snapshot = self._changes_since(since)
+            event = "snapshot" if snapshot else "counts"
+            yield f"id: {since}\nevent: {event}\ndata: {json.dumps(changes)}\n\n"
 
     def _generate_results_table(self) -> List[Dict[str, str]]:
 
-        table = []
-        for start_letter, data in sorted(self.results.items()):
-            table.append({
-                "Starting letter": start_letter.upper(),
-                "Count": str(data["count"]),  # Convert to string for JSON serialization
-                "Words": ", ".join(data["words"]) if data["words"] else ""
-            })
+        with self._changed:
+            version, table = self._table_cache
+            if version == self.version:
+                return table
+            table = []
+            for start_letter, data in sorted(self.results.items()):
+                table.append({
+                    "Starting letter": start_letter.upper(),
+                    "Count": str(data["count"]),  # Convert to string for JSON serialization
+                    "Words": ", ".join(data["words"]) if data["words"] else ""
+                })
+            self._table_cache = (self.version, table)
         return table
 
     def _send_test_request(self) -> None:
 
         time.sleep(1)
+        self._register()
+
+    def _register(self) -> None:
+
         self.sidecar.send(
-            "http://127.0.0.1:1001/register",
-            {"type": "learner", "url": f"http://{self.host}:{self.port}"},
+            f"{self.coordinator_url}/register",
+            {"type": "learner", "url": self.url},
             retries=3,
             delay=1
         )
@@ -79,11 +178,11 @@ class Learner:
         test_thread.daemon = True
         test_thread.start()
 
-        self.app.run(host=self.host, port=self.port)
+        self.sidecar.serve(self.app, self.url)
 
 
-def run_learner() -> None:
-    learner = Learner()
+def run_learner(transport: str = "http") -> None:
+    learner = Learner(transport=transport)
     learner.run()
 
 
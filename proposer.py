@@ -1,21 +1,30 @@
 from flask import Flask, request
-from sidecar import Sidecar
+from sidecar import Sidecar, node_url
+from tokenizer import BatchTokenizer
 import threading
 import time
-import re
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, List, Optional
 
 
 class Proposer:
-    def __init__(self, host: str = "127.0.0.1", port: int = 1002):
+    def __init__(self, host: str = "127.0.0.1", port: int = 1002, transport: str = "http",
+                 coordinator_url: Optional[str] = None, tokenizer_processes: int = 0):
         self.app = Flask(__name__)
         self.sidecar = Sidecar("proposer")
         self.host = host
         self.port = port
+        self.url = node_url(transport, host, port, "proposer")
+        self.coordinator_url = coordinator_url or node_url(transport, "127.0.0.1", 1001, "coordinator")
         self.letter_range: Optional[str] = None
         self.nodes: Dict[str, any] = {"acceptors": [], "learner": None}
         self.word_counts: Dict[str, Dict[str, any]] = {}
+        self.tokenizer = BatchTokenizer(processes=tokenizer_processes)
+        self._lock = threading.Lock()
+        self.stats: Dict[str, float] = {"lines": 0, "in_flight": 0, "latency": 0.0}
+        # Batch latencies since the last heartbeat: [total seconds, batches].
+        self._latency_window = [0.0, 0]
         self._setup_routes()
+        self.sidecar.install_debug_routes(self.app)
 
     def _setup_routes(self) -> None:
 
@@ -25,18 +34,34 @@ class Proposer:
                 print("Error: Range not set")
                 return {"error": "Range not set"}, 400
 
+            letter_range = self.letter_range
             line = request.json.get("text", "")
             print(f"Received line: {line}")
 
-            start, end = self.letter_range.split("-")
-            words = re.findall(r'\b[a-zA-Z]+\b', line.lower())
-            print(f"Words found: {words}")
+            if self._process_lines([line], letter_range) is None:
+                return {"error": "No acceptor accepted the line"}, 502
+            return {"status": f"Processed line for range {letter_range}"}
 
-            count, matched_words = self._process_words(words, start, end)
-            self._update_word_counts(count, matched_words)
-            self._send_to_acceptors()
+        @self.app.route("/lines", methods=["POST"])
+        def receive_lines():
+            if not self.letter_range:
+                print("Error: Range not set")
+                return {"error": "Range not set"}, 400
 
-            return {"status": f"Processed line for range {self.letter_range}"}
+            # The coordinator credits the batch to the range it was counted under,
+            # even if /set_range moves this proposer while it is being processed.
+            letter_range = self.letter_range
+            lines = request.json.get("lines", [])
+            print(f"Received {len(lines)} lines")
+
+            count = self._process_lines(lines, letter_range)
+            if count is None:
+                return {"error": "No acceptor accepted the batch"}, 502
+            return {
+                "status": f"Processed {len(lines)} lines for range {letter_range}",
+                "range": letter_range,
+                "count": count
+            }
 
         @self.app.route("/set_range", methods=["POST"])
         def set_range():
@@ -58,59 +83,111 @@ class Proposer:
 
     def _is_valid_range(self, range_str: str) -> bool:
 
-        return (isinstance(range_str, str) and
-                "-" in range_str and
-                len(range_str.split("-")) == 2)
-
-    def _process_words(self, words: List[str], start: str, end: str) -> Tuple[int, List[str]]:
-
-        count = 0
-        matched_words = []
-        for word in words:
-            if word and start.lower() <= word[0].lower() <= end.lower():
-                count += 1
-                matched_words.append(word)
-        print(f"Matched words for {self.letter_range}: {matched_words}")
-        return count, matched_words
+        parts = range_str.split("-") if isinstance(range_str, str) else []
+        return (len(parts) == 2 and
+                all(len(p) == 1 and p.isascii() and p.isalpha() for p in parts))
+
+    def _process_lines(self, lines: List[str], letter_range: str) -> Optional[int]:
+        """Count the matched words of a batch; None unless an acceptor and the learner took them."""
+
+        started = time.perf_counter()
+        self.stats["in_flight"] += 1
+        try:
+            start, end = letter_range.split("-")
+            with self.sidecar.trace("tokenize"):
+                matched_words = self.tokenizer.tokenize(lines, start, end)
+            print(f"Matched words for {letter_range}: {matched_words}")
+
+            with self.sidecar.trace("update"):
+                self._update_word_counts(len(matched_words), matched_words)
+            if not self._send_to_acceptors(letter_range, matched_words):
+                return None
+            return len(matched_words)
+        finally:
+            self.stats["in_flight"] -= 1
+            self._record_latency(time.perf_counter() - started, len(lines))
 
     def _update_word_counts(self, count: int, matched_words: List[str]) -> None:
 
-        if self.letter_range not in self.word_counts:
-            self.word_counts[self.letter_range] = {"count": 0, "words": []}
-        self.word_counts[self.letter_range]["count"] += count
-        self.word_counts[self.letter_range]["words"].extend(matched_words)
+        with self._lock:
+            if self.letter_range not in self.word_counts:
+                self.word_counts[self.letter_range] = {"count": 0, "words": []}
+            self.word_counts[self.letter_range]["count"] += count
+            self.word_counts[self.letter_range]["words"].extend(matched_words)
 
-    def _send_to_acceptors(self) -> None:
+    def _send_to_acceptors(self, letter_range: str, words: List[str]) -> bool:
+        """Forward the words matched in one batch; the learner keeps the running union.
 
+        Returns True if at least one acceptor accepted them (which means the
+        learner confirmed them), or if there was nothing to send.
+        """
+        if not words:
+            return True
         if not self.nodes["acceptors"]:
             print("No acceptors registered")
-            return
+            return False
 
+        payload = {"letter_range": letter_range, "count": len(words), "words": words}
+        accepted = False
         for acceptor in self.nodes["acceptors"][:2]:
-            print(f"Sending to {acceptor['url']}: {self.word_counts[self.letter_range]}")
-            self.sidecar.send(
+            print(f"Sending to {acceptor['url']}: {payload}")
+            response = self.sidecar.send(
                 f"{acceptor['url']}/accept",
-                {
-                    "letter_range": self.letter_range,
-                    "count": self.word_counts[self.letter_range]["count"],
-                    "words": self.word_counts[self.letter_range]["words"]
-                },
+                payload,
                 retries=3,
                 delay=1
             )
+            accepted = accepted or (response is not None and response.status_code < 400)
+        return accepted
+
+    def _record_latency(self, elapsed: float, lines: int = 1) -> None:
+
+        with self._lock:
+            self.stats["lines"] += lines
+            self._latency_window[0] += elapsed
+            self._latency_window[1] += 1
+
+    def _window_latency(self) -> float:
+        """Mean batch latency since the last call; 0.0 when idle.
+
+        A proposer demoted as slow gets no batches, so an idle window must not
+        keep repeating the latency that got it demoted.
+        """
+        with self._lock:
+            total, batches = self._latency_window
+            self._latency_window = [0.0, 0]
+            self.stats["latency"] = total / batches if batches else 0.0
+            return self.stats["latency"]
+
+    def _heartbeat_payload(self) -> Dict[str, any]:
+
+        return {
+            "url": self.url,
+            "type": "proposer",
+            "load": self.stats["in_flight"],
+            "lines": self.stats["lines"],
+            "latency": self._window_latency()
+        }
 
     def _send_test_request(self) -> None:
 
         time.sleep(1)
+        self._register()
+
+    def _register(self) -> None:
+
         self.sidecar.send(
-            "http://127.0.0.1:1001/register",
-            {"type": "proposer", "url": f"http://{self.host}:{self.port}"},
+            f"{self.coordinator_url}/register",
+            {"type": "proposer", "url": self.url},
             retries=3,
             delay=1
         )
 
     def run(self, letter_range: str) -> None:
 
+        if not self._is_valid_range(letter_range):
+            print(f"Error: Invalid range {letter_range}, expected two letters such as A-M")
+            return
         self.letter_range = letter_range
         print(f"Proposer is responsible for letter range: {self.letter_range}")
 
@@ -118,11 +195,13 @@ class Proposer:
         test_thread.daemon = True
         test_thread.start()
 
-        self.app.run(host=self.host, port=self.port)
+        self.sidecar.start_heartbeat(f"{self.coordinator_url}/heartbeat", self._heartbeat_payload)
+
+        self.sidecar.serve(self.app, self.url)
 
 
-def run_proposer(rng: str) -> None:
-    proposer = Proposer()
+def run_proposer(rng: str, transport: str = "http", tokenizer_processes: int = 0) -> None:
+    proposer = Proposer(transport=transport, tokenizer_processes=tokenizer_processes)
     proposer.run(rng)
 
 
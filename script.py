@@ -10,52 +10,86 @@ class NodeRunner:
     }
 
     @staticmethod
-    def run_coordinator():
+    def run_coordinator(transport: str = "http"):
         print("Starting Coordinator node...")
         from coordinator import run_coordinator
-        run_coordinator()
+        run_coordinator(transport)
 
     @staticmethod
-    def run_proposer(letter_range: str, module: str):
+    def run_proposer(letter_range: str, module: str, transport: str = "http", processes: int = 0):
         print(f"Starting Proposer node for range {letter_range}...")
         module = __import__(module)
-        module.run_proposer(letter_range)
+        module.run_proposer(letter_range, transport, processes)
 
     @staticmethod
-    def run_acceptor(module: str):
+    def run_acceptor(module: str, transport: str = "http"):
         print("Starting Acceptor node...")
         module = __import__(module)
-        module.run_acceptor()
+        module.run_acceptor(transport)
 
     @staticmethod
-    def run_learner():
+    def run_learner(transport: str = "http"):
         print("Starting Learner node...")
         from learner import run_learner
-        run_learner()
+        run_learner(transport)
+
+    @staticmethod
+    def run_local(filename: str) -> Optional[list]:
+        """Run every role in this process over the in-process transport and process one file."""
+        print("Starting all nodes in-process...")
+        from coordinator import Coordinator
+        from learner import Learner
+        coordinator = Coordinator(transport="inproc")
+        coordinator.sidecar.serve(coordinator.app, coordinator.url)
+
+        nodes = [
+            __import__("proposer").Proposer(transport="inproc"),
+            __import__("proposer2").Proposer(transport="inproc"),
+            __import__("acceptor").Acceptor(transport="inproc"),
+            __import__("acceptor2").Acceptor(transport="inproc"),
+            Learner(transport="inproc"),
+        ]
+        for node in nodes:
+            node.sidecar.serve(node.app, node.url)
+            node._register()
+
+        response = coordinator.sidecar.send(f"{coordinator.url}/start", {"filename": filename})
+        print(f"Start response: {response.status_code if response else 'Failed'}")
+        results = nodes[-1]._generate_results_table()
+        for row in results:
+            print(row)
+        return results
 
 def main():
     parser = argparse.ArgumentParser(description="Run a node in a distributed consensus system.")
     parser.add_argument("--role", type=str, required=True,
-                       choices=["coordinator", "proposer", "proposer2", "acceptor", "acceptor2", "learner"])
+                       choices=["coordinator", "proposer", "proposer2", "acceptor", "acceptor2", "learner", "local"])
     parser.add_argument("--range", type=str, help="Letter range assigned to proposer (e.g., A-C)")
     parser.add_argument("--port", type=int, default=0, help="Port for proposer or acceptor")
+    parser.add_argument("--transport", type=str, default="http", choices=["http", "unix"],
+                       help="Transport between nodes (unix: Unix domain sockets for co-located nodes)")
+    parser.add_argument("--processes", type=int, default=0,
+                       help="Worker processes a proposer may use to tokenize batches over 1 MiB")
+    parser.add_argument("--file", type=str, default="sample.txt", help="Input file for the local role")
     args = parser.parse_args()
 
     runner = NodeRunner()
 
     if args.role == "coordinator":
-        runner.run_coordinator()
+        runner.run_coordinator(args.transport)
     elif args.role in ("proposer", "proposer2"):
         if not args.range:
             print(f"Error: --range is required for {args.role} role.")
             return
         module = "proposer" if args.role == "proposer" else "proposer2"
-        runner.run_proposer(args.range, module)
+        runner.run_proposer(args.range, module, args.transport, args.processes)
     elif args.role in ("acceptor", "acceptor2"):
         module = "acceptor" if args.role == "acceptor" else "acceptor2"
-        runner.run_acceptor(module)
+        runner.run_acceptor(module, args.transport)
     elif args.role == "learner":
-        runner.run_learner()
+        runner.run_learner(args.transport)
+    elif args.role == "local":
+        runner.run_local(args.file)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,14 +1,190 @@
 import requests
 import logging
 import time
-from typing import Any, Optional
+import json
+import socket
+import http.client
+import threading
+import sys
+import io
+import cProfile
+import pstats
+import contextlib
+from collections import Counter
+from typing import Any, Callable, Dict, Optional
+from flask import Flask, Response as FlaskResponse, g, has_request_context, request
+from urllib.parse import urlsplit, quote, unquote
 from requests import Response
 
 
+class TransportResponse:
+    """Minimal response object returned by the non-HTTP transports."""
+
+    def __init__(self, status_code: int, content: bytes) -> None:
+        self.status_code = status_code
+        self.content = content
+
+    def json(self) -> Any:
+        return json.loads(self.content) if self.content else None
+
+
+class HttpTransport:
+    """Default transport: HTTP over TCP via requests, with a pooled session."""
+
+    schemes = ("http", "https")
+
+    def __init__(self, pool_size: int = 64) -> None:
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=16, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def post(self, url: str, data: Any, timeout: Optional[float] = None) -> Response:
+        return self.session.post(url, json=data, timeout=timeout)
+
+    def serve(self, app, url: str) -> None:
+        parts = urlsplit(url)
+        app.run(host=parts.hostname, port=parts.port)
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+
+    def __init__(self, socket_path: str) -> None:
+        super().__init__("localhost", timeout=None)
+        self.socket_path = socket_path
+
+    def connect(self) -> None:
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+class UnixSocketTransport:
+    """HTTP over a Unix domain socket for nodes that share a host.
+
+    URLs look like ``http+unix://%2Ftmp%2Fproposer.sock/line``: the
+    percent-encoded socket path takes the place of host and port. Each thread
+    keeps one keep-alive connection per socket path.
+    """
+
+    schemes = ("http+unix",)
+
+    def __init__(self) -> None:
+        self._local = threading.local()
+
+    def _connection(self, socket_path: str) -> _UnixHTTPConnection:
+
+        connections = getattr(self._local, "connections", None)
+        if connections is None:
+            connections = self._local.connections = {}
+        if socket_path not in connections:
+            connections[socket_path] = _UnixHTTPConnection(socket_path)
+        return connections[socket_path]
+
+    def post(self, url: str, data: Any, timeout: Optional[float] = None) -> TransportResponse:
+        parts = urlsplit(url)
+        socket_path = unquote(parts.netloc)
+        body = json.dumps(data).encode()
+        for attempt in range(2):
+            conn = self._connection(socket_path)
+            reused = conn.sock is not None
+            conn.timeout = timeout
+            if reused:
+                conn.sock.settimeout(timeout)
+            try:
+                conn.request("POST", parts.path or "/", body=body,
+                             headers={"Content-Type": "application/json"})
+                resp = conn.getresponse()
+                return TransportResponse(resp.status, resp.read())
+            except socket.timeout as e:
+                conn.close()
+                raise requests.Timeout(e)
+            except (BrokenPipeError, http.client.RemoteDisconnected) as e:
+                # The server closed the kept-alive connection before reading this
+                # request; only then is it safe to send the POST again.
+                conn.close()
+                if attempt == 1 or not reused:
+                    raise requests.ConnectionError(e)
+            except (OSError, http.client.HTTPException) as e:
+                conn.close()
+                raise requests.ConnectionError(e)
+
+    def serve(self, app, url: str) -> None:
+        socket_path = unquote(urlsplit(url).netloc)
+        app.run(host=f"unix://{socket_path}")
+
+
+class InProcessTransport:
+    """Dispatches requests straight into Flask apps living in this process.
+
+    Nodes served on ``inproc://<name>`` are kept in a shared registry, so every
+    role can run in one process (tests, benchmarks) without sockets or HTTP
+    parsing.
+    """
+
+    schemes = ("inproc",)
+    _apps: Dict[str, Any] = {}
+    _lock = threading.Lock()
+
+    def _client(self, url: str):
+        name = urlsplit(url).netloc
+        with self._lock:
+            app = self._apps.get(name)
+        if app is None:
+            raise requests.ConnectionError(f"No in-process node registered as {name}")
+        return app.test_client()
+
+    def post(self, url: str, data: Any, timeout: Optional[float] = None) -> TransportResponse:
+        # Handlers run on the caller's thread, so there is nothing to time out.
+        resp = self._client(url).post(urlsplit(url).path or "/", json=data)
+        return TransportResponse(resp.status_code, resp.get_data())
+
+    def serve(self, app, url: str) -> None:
+        with self._lock:
+            self._apps[urlsplit(url).netloc] = app
+
+
+TRANSPORTS = (HttpTransport, UnixSocketTransport, InProcessTransport)
+
+
+def node_url(transport: str, host: str, port: int, name: str) -> str:
+    """Build the base URL a node advertises for the given transport name."""
+    if transport == "http":
+        return f"http://{host}:{port}"
+    if transport == "unix":
+        return f"http+unix://{quote(f'/tmp/{name}.sock', safe='')}"
+    if transport == "inproc":
+        return f"inproc://{name}"
+    raise ValueError(f"Unknown transport: {transport}")
+
+
+_NO_TRACE = contextlib.nullcontext()
+
+
+def _collapse_stack(frame) -> str:
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append(f"{code.co_filename.rsplit('/', 1)[-1]}:{code.co_name}")
+        frame = frame.f_back
+    return ";".join(reversed(stack))
+
+
 class Sidecar:
+    MAX_PROFILE_SECONDS = 60.0
+    # cProfile allows one active profiler per interpreter (3.12+) or per thread,
+    # so at most one request in the process is profiled at a time.
+    _profile_slot = threading.Lock()
+
     def __init__(self, node_name: str, log_level: int = logging.INFO) -> None:
 
         self.node_name = node_name
+        self._transports: Dict[str, Any] = {}
+        self.tracing = False
+        self.trace_stats: Dict[str, Dict[str, float]] = {}
+        self._profiling = False
+        self._profile: Optional[cProfile.Profile] = None
+        self._debug_lock = threading.Lock()
         self._setup_logging(log_level)
 
     def _setup_logging(self, log_level: int) -> None:
@@ -21,12 +197,31 @@ class Sidecar:
                 format='%(asctime)s - %(levelname)s - %(message)s'
             )
 
-    def send(self, url: str, data: Any, retries: int = 3, delay: float = 1.0) -> Optional[Response]:
+    def transport_for(self, url: str):
+        """Return the transport serving the scheme of ``url``."""
+        scheme = urlsplit(url).scheme
+        if scheme not in self._transports:
+            for transport_cls in TRANSPORTS:
+                if scheme in transport_cls.schemes:
+                    self._transports[scheme] = transport_cls()
+                    break
+            else:
+                raise ValueError(f"Unsupported URL scheme: {scheme}")
+        return self._transports[scheme]
+
+    def serve(self, app, url: str) -> None:
+        """Expose ``app`` at ``url``; blocks for socket-based transports."""
+        self.transport_for(url).serve(app, url)
 
+    def send(self, url: str, data: Any, retries: int = 3, delay: float = 1.0,
+             timeout: Optional[float] = 30.0) -> Optional[Response]:
+
+        transport = self.transport_for(url)
         for attempt in range(1, retries + 1):
             try:
                 logging.info(f"Attempt {attempt} - Sending to {url}: {data}")
-                response = requests.post(url, json=data)
+                with self.trace("send"):
+                    response = transport.post(url, data, timeout)
                 logging.info(f"Response: {response.status_code}")
                 return response
             except requests.RequestException as e:
@@ -37,6 +232,146 @@ class Sidecar:
         logging.error(f"All {retries} attempts failed for {url}")
         return None
 
+    def trace(self, name: str):
+        """Time a block under ``name`` for the current route; a shared no-op when tracing is off."""
+        if not self.tracing:
+            return _NO_TRACE
+        return self._span(name)
+
+    @contextlib.contextmanager
+    def _span(self, name: str):
+        key = f"{request.path} {name}" if has_request_context() else name
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._debug_lock:
+                entry = self.trace_stats.setdefault(key, {"count": 0, "total": 0.0})
+                entry["count"] += 1
+                entry["total"] += elapsed
+
+    def install_debug_routes(self, app: Flask) -> None:
+        """Add /debug/profile and /debug/trace to a node's Flask app."""
+
+        @app.before_request
+        def _begin_request():
+            if request.path.startswith("/debug/"):
+                return
+            if self.tracing:
+                g.trace_started = time.perf_counter()
+            if self._profiling and self._profile_slot.acquire(blocking=False):
+                try:
+                    if self._profile is None:
+                        raise ValueError("profiling window closed")
+                    self._profile.enable()
+                    g.profiling = True
+                except ValueError:
+                    # The window just closed, or another profiler is active in this
+                    # interpreter; leave this request alone.
+                    self._profile_slot.release()
+
+        @app.teardown_request
+        def _end_request(exc):
+            if g.pop("profiling", False):
+                self._profile.disable()
+                self._profile_slot.release()
+            started = g.pop("trace_started", None)
+            if started is not None:
+                with self._debug_lock:
+                    entry = self.trace_stats.setdefault(f"{request.path} total", {"count": 0, "total": 0.0})
+                    entry["count"] += 1
+                    entry["total"] += time.perf_counter() - started
+
+        @app.route("/debug/profile", methods=["GET"])
+        def debug_profile():
+            try:
+                seconds = float(request.args.get("seconds", 5))
+                interval = float(request.args.get("interval", 0.005))
+            except ValueError:
+                return {"error": "seconds and interval must be numbers"}, 400
+            if not 0 < seconds <= self.MAX_PROFILE_SECONDS or not 0.001 <= interval <= 1.0:
+                return {"error": f"seconds must be in (0, {self.MAX_PROFILE_SECONDS}], "
+                                 "interval in [0.001, 1]"}, 400
+
+            if request.args.get("mode", "cprofile") == "sample":
+                return FlaskResponse(self.sample_stacks(seconds, interval), mimetype="text/plain")
+            text = self.profile_requests(seconds)
+            if text is None:
+                return {"error": "Profiling already in progress"}, 409
+            return FlaskResponse(text, mimetype="text/plain")
+
+        @app.route("/debug/trace", methods=["GET", "POST"])
+        def debug_trace():
+            if request.method == "POST":
+                data = request.json or {}
+                enabled = data.get("enabled", self.tracing)
+                reset = data.get("reset", False)
+                if not isinstance(enabled, bool) or not isinstance(reset, bool):
+                    return {"error": "enabled and reset must be JSON booleans"}, 400
+                self.tracing = enabled
+                if reset:
+                    with self._debug_lock:
+                        self.trace_stats = {}
+            with self._debug_lock:
+                spans = {key: dict(entry) for key, entry in self.trace_stats.items()}
+            return {"enabled": self.tracing, "spans": spans}
+
+    def profile_requests(self, seconds: float, limit: int = 40) -> Optional[str]:
+        """Profile requests handled in the next ``seconds`` with one cProfile profiler.
+
+        Concurrent requests are not profiled while another one holds the
+        profiler; use the sampler for a view across all threads. Returns None
+        if a profiling window is already open.
+        """
+        with self._debug_lock:
+            if self._profiling:
+                return None
+            self._profile = cProfile.Profile()
+            self._profiling = True
+        time.sleep(seconds)
+        self._profiling = False
+
+        # Wait for a request still running under the profiler to finish.
+        with self._profile_slot:
+            profile, self._profile = self._profile, None
+        out = io.StringIO()
+        try:
+            stats = pstats.Stats(profile, stream=out)
+        except TypeError:
+            # Raised when the profiler was never enabled.
+            stats = None
+        if stats is None or not stats.stats:
+            return "No requests were handled while profiling.\n"
+        stats.sort_stats("cumulative").print_stats(limit)
+        return out.getvalue()
+
+    def sample_stacks(self, seconds: float, interval: float = 0.005) -> str:
+        """Sample all other threads' stacks for ``seconds`` and return collapsed-stack lines."""
+        own = threading.get_ident()
+        counts: Counter = Counter()
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id != own:
+                    counts[_collapse_stack(frame)] += 1
+            time.sleep(interval)
+        return "".join(f"{stack} {count}\n" for stack, count in counts.most_common())
+
+    def start_heartbeat(self, url: str, payload: Callable[[], Dict[str, Any]],
+                        interval: float = 2.0) -> threading.Thread:
+        """Post ``payload()`` to ``url`` every ``interval`` seconds from a daemon thread."""
+
+        def beat() -> None:
+            while True:
+                self.send(url, payload(), retries=1)
+                time.sleep(interval)
+
+        thread = threading.Thread(target=beat)
+        thread.daemon = True
+        thread.start()
+        return thread
+
 
 if __name__ == "__main__":
     # Example usage for testing